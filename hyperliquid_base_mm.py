@@ -0,0 +1,238 @@
+from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import time
+
+import numpy as np
+from hyperliquid_indicators import wilder_atr
+from hyperliquid_trade import API_URL, SESSION, log, parse_response, price_formatter, quantity_formatter, tally_cancels
+
+_INTERVAL_MS = {
+    '1m': 60_000, '5m': 300_000, '15m': 900_000,
+    '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000
+}
+
+
+class TokenBucket:
+    """Async token bucket: acquire() only sleeps once the burst budget is spent"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BaseMarketMaker(ABC):
+    """Candle, ATR and order plumbing shared by the HIP and spot market makers"""
+
+    # Market settings, overridden by each bot from its module constants
+    COIN = None
+    SIDE_LABELS = ('buy', 'sell')
+    CHECK_INTERVAL = 60
+    ORDER_EXPIRY_MINUTES = 15
+    ORDER_RATE_LIMIT = 10
+    ORDER_BURST = 20
+    ATR_PERIOD = 14
+    BASE_SPREAD = 0.001
+    VOL_MULTIPLIER_MIN = 0.5
+    VOL_MULTIPLIER_MAX = 2.0
+    SIZE_DECIMALS = 5
+    TICK_SIZE = 1
+    ORDER_USD_ARR = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Formatters are picked once from the market constants instead of branching per call
+        cls.format_quantity = staticmethod(quantity_formatter(cls.SIZE_DECIMALS))
+        cls.format_price = staticmethod(price_formatter(cls.TICK_SIZE))
+
+    def __init__(self):
+        self._candle_cache = {}
+        self._atr_cache = None
+        # Dedicated pool for blocking HTTP/SDK calls instead of the loop's shared default executor
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hl-mm')
+        self._order_limiter = TokenBucket(self.ORDER_RATE_LIMIT, self.ORDER_BURST)
+        try:
+            self.trader = self._create_trader()
+            self.trader.start_mid_stream()
+            self.trading_enabled = True
+        except Exception as e:
+            log.error(f"Trading initialization failed: {e}")
+            self.trading_enabled = False
+
+    @abstractmethod
+    def _create_trader(self):
+        """Build the HyperliquidTrader for this market"""
+
+    @abstractmethod
+    def _print_banner(self):
+        """Print the bot's settings before the main loop starts"""
+
+    @abstractmethod
+    async def run_single_iteration(self):
+        """Fetch market state, place tier orders and cancel expired ones"""
+
+    async def _off(self, fn, *args):
+        """Run a blocking call on the bot's thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def get_candles(self, interval: str = '5m', limit: int = 20):
+        """Fetch closed candles from Hyperliquid API as an (N, 3) float64 array of high/low/close"""
+        bar_ms = _INTERVAL_MS[interval]
+        # Only closed bars are requested, so a fetch stays valid until the next bar closes
+        bar_start = time.time_ns() // 1_000_000 // bar_ms * bar_ms
+        end_time = bar_start - 1
+        start_time = bar_start - (bar_ms * limit)
+
+        cache_key = (interval, limit, bar_start)
+        if cache_key in self._candle_cache:
+            return self._candle_cache[cache_key]
+
+        payload = {
+            'type': 'candleSnapshot',
+            'req': {
+                'coin': self.COIN,
+                'interval': interval,
+                'startTime': start_time,
+                'endTime': end_time
+            }
+        }
+        try:
+            response = await self._off(partial(SESSION.post, API_URL, json=payload))
+            data = parse_response(response)
+        except Exception as e:
+            # No candles only drops the volatility adjustment; order placement and cancels still run
+            log.error(f"Candles error: {e}")
+            data = None
+        if not data:
+            return np.empty((0, 3))
+
+        candles = np.array([(c['h'], c['l'], c['c']) for c in data], dtype=np.float64)
+        self._candle_cache = {cache_key: candles}
+        return candles
+
+    def calculate_atr(self, candles, period: int = 14):
+        """Calculate ATR using Wilder's EMA method"""
+        if len(candles) < period + 1:
+            return None
+
+        return float(wilder_atr(candles[:, 0], candles[:, 1], candles[:, 2], period))
+
+    def get_volatility_multiplier(self, mid_price, candles):
+        """Calculate volatility multiplier based on ATR"""
+        if len(candles) == 0:
+            return 1.0
+
+        # get_candles hands back the same array until the next bar closes, so its ATR is reused too
+        if self._atr_cache is not None and self._atr_cache[0] is candles:
+            atr = self._atr_cache[1]
+        else:
+            atr = self.calculate_atr(candles, self.ATR_PERIOD)
+            self._atr_cache = (candles, atr)
+        if atr is None or mid_price <= 0:
+            return 1.0
+
+        atr_ratio = atr / mid_price
+        vol_multiplier = max(self.VOL_MULTIPLIER_MIN, min(self.VOL_MULTIPLIER_MAX, atr_ratio / self.BASE_SPREAD))
+        return vol_multiplier
+
+    async def _trader_concurrent(self, calls):
+        """Run blocking trader calls concurrently, paced by the shared order rate limiter"""
+        async def run_one(call):
+            await self._order_limiter.acquire()
+            # Nonce spacing is applied on the worker right before the SDK call, not when the call is queued for a worker
+            return await self._off(self.trader.run_action, call)
+
+        return await asyncio.gather(*(run_one(call) for call in calls), return_exceptions=True)
+
+    async def _place_orders_concurrent(self, order_method, orders):
+        """Place orders concurrently, paced by the shared order rate limiter"""
+        return await self._trader_concurrent([partial(order_method, qty, price) for qty, price in orders])
+
+    def _tier_prices(self, mid_price, spreads, is_buy):
+        """Formatted tier prices below (buy) or above (sell) mid, with their formatted quantities"""
+        prices = self.format_price(mid_price * (1 - spreads if is_buy else 1 + spreads))
+        return prices, self.format_quantity(self.ORDER_USD_ARR / prices)
+
+    async def _submit_tiers(self, side_name, order_method, orders, spreads, is_buy):
+        """Place one side's tier orders and log how many were accepted"""
+        try:
+            results = await self._place_orders_concurrent(order_method, orders)
+            success_count = sum(1 for r in results if not isinstance(r, Exception) and r.get('success'))
+
+            sign = '-' if is_buy else '+'
+            order_str = "  ".join(f"{sign}{spread*100:.2f}% @{int(price)}" for (qty, price), spread in zip(orders, spreads))
+            log.info(f"{side_name}({success_count}/{len(orders)}): {order_str}")
+
+            return success_count > 0
+
+        except Exception as e:
+            log.error(f"{side_name} orders error: {e}")
+            return False
+
+    async def cancel_old_orders(self, open_orders):
+        """Cancel orders older than ORDER_EXPIRY_MINUTES from the iteration's OpenOrders snapshot"""
+        try:
+            cutoff_ms = time.time_ns() // 1_000_000 - self.ORDER_EXPIRY_MINUTES * 60_000
+            expired = open_orders.timestamps < cutoff_ms
+            if not expired.any():
+                return
+
+            # One signed cancel action for every stale order instead of one per order
+            (results,) = await self._trader_concurrent([partial(self.trader.bulk_cancel, open_orders.oids[expired].tolist())])
+            if isinstance(results, Exception):
+                raise results
+            cancelled_buy, cancelled_sell = tally_cancels(open_orders.is_buy[expired], results)
+
+            if cancelled_buy > 0 or cancelled_sell > 0:
+                buy_label, sell_label = self.SIDE_LABELS
+                log.info(f"Cancelled old orders: {cancelled_buy} {buy_label}, {cancelled_sell} {sell_label} (>{self.ORDER_EXPIRY_MINUTES}min)")
+
+        except Exception as e:
+            log.error(f"Cancel old orders error: {e}")
+
+    async def get_mid_price(self):
+        """Get mid price from the allMids stream, falling back to the allMids API"""
+        try:
+            mid_price = self.trader.get_streamed_mid()
+            if mid_price:
+                return mid_price
+            return await self._off(self.trader.get_mid_price)
+        except Exception as e:
+            log.error(f"Mid price error: {e}")
+            return None
+
+    async def run(self):
+        """Main loop"""
+        self._print_banner()
+
+        try:
+            while True:
+                try:
+                    await self.run_single_iteration()
+                    await asyncio.sleep(self.CHECK_INTERVAL)
+
+                except KeyboardInterrupt:
+                    log.info("\nShutting down...")
+                    break
+                except Exception as e:
+                    log.error(f"\nMain loop error: {e}")
+                    await asyncio.sleep(5)
+        finally:
+            # The SDK's websocket ping thread is non-daemon and would otherwise keep the process alive
+            if self.trading_enabled:
+                self.trader.stop_mid_stream()
@@ -1,11 +1,20 @@
 import asyncio
-from datetime import datetime
+from functools import partial
 import time
-import requests
 import numpy as np
 import hyperliquid_trade
+from hyperliquid_trade import log
+from hyperliquid_indicators import inventory_adjusted_spreads, wilder_atr
 
-API_URL = 'https://api.hyperliquid.xyz/info'
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+_INTERVAL_MS = {
+    '1m': 60_000, '5m': 300_000, '15m': 900_000,
+    '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000
+}
 
 COIN = 'BTC'
 SIZE_DECIMALS = 3
@@ -15,11 +24,15 @@ ORDER_SIZE_USD = 500
 CHECK_INTERVAL = 60
 MAX_OPEN_ORDERS = 50
 ORDER_EXPIRY_MINUTES = 15
+MAX_CONCURRENT_ORDERS = 5
 
 # spread settings
 LONG_SPREADS = [0.001, 0.002, 0.003, 0.004, 0.005]
 SHORT_SPREADS = [0.001, 0.002, 0.003, 0.004, 0.005]
 ORDER_RATIOS = [0.50, 0.20, 0.10, 0.10, 0.10]
+LONG_SPREADS_ARR = np.array(LONG_SPREADS, dtype=np.float64)
+SHORT_SPREADS_ARR = np.array(SHORT_SPREADS, dtype=np.float64)
+ORDER_USD_ARR = ORDER_SIZE_USD * np.array(ORDER_RATIOS, dtype=np.float64)
 
 # Position limits
 MAX_POSITION_USD = 10000
@@ -35,6 +48,8 @@ VOL_MULTIPLIER_MAX = 2.0
 
 class HyperliquidFuturesMM:
     def __init__(self):
+        self._candle_cache = {}
+        self._order_limiter = asyncio.Semaphore(MAX_CONCURRENT_ORDERS)
         try:
             self.trader = hyperliquid_trade.HyperliquidTrader(
                 coin=COIN,
@@ -44,51 +59,49 @@ class HyperliquidFuturesMM:
             )
             self.trading_enabled = True
         except Exception as e:
-            print(f"[ERROR] Trading init failed: {e}")
+            log.error(f"[ERROR] Trading init failed: {e}")
             self.trading_enabled = False
 
-    @staticmethod
-    def format_quantity(qty):
-        return int(round(qty)) if SIZE_DECIMALS == 0 else round(qty, SIZE_DECIMALS)
+    # Formatters are picked once from the market constants instead of branching per call
+    format_quantity = staticmethod(hyperliquid_trade.quantity_formatter(SIZE_DECIMALS))
+    format_price = staticmethod(hyperliquid_trade.price_formatter(TICK_SIZE))
 
-    @staticmethod
-    def format_price(price):
-        return round(price / TICK_SIZE) * TICK_SIZE
+    async def get_candles(self, interval='5m', limit=20):
+        bar_ms = _INTERVAL_MS[interval]
+        # Only closed bars are requested, so a fetch stays valid until the next bar closes
+        bar_start = int(time.time() * 1000) // bar_ms * bar_ms
+        end_time = bar_start - 1
+        start_time = bar_start - (bar_ms * limit)
 
-    def get_candles(self, interval='5m', limit=20):
-        interval_ms = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000}
-        end_time = int(time.time() * 1000)
-        start_time = end_time - (interval_ms[interval] * limit)
+        cache_key = (interval, limit, bar_start)
+        if cache_key in self._candle_cache:
+            return self._candle_cache[cache_key]
 
         payload = {
             'type': 'candleSnapshot',
             'req': {'coin': COIN, 'interval': interval, 'startTime': start_time, 'endTime': end_time}
         }
         try:
-            response = requests.post(API_URL, json=payload, timeout=10)
-            return response.json() if response.status_code == 200 else []
-        except:
-            return []
+            response = await asyncio.to_thread(hyperliquid_trade.SESSION.post, hyperliquid_trade.API_URL, json=payload, timeout=10)
+            data = hyperliquid_trade.parse_response(response)
+        except Exception:
+            data = []
+        if not data:
+            return np.empty((0, 4))
+
+        # o/h/l/c columns, parsed once per bar
+        candles = np.array([(c['o'], c['h'], c['l'], c['c']) for c in data], dtype=np.float64)
+        self._candle_cache = {cache_key: candles}
+        return candles
 
     def calculate_atr(self, candles, period=14):
         if len(candles) < period + 1:
             return None
 
-        tr_list = []
-        for i in range(1, len(candles)):
-            high, low = float(candles[i]['h']), float(candles[i]['l'])
-            prev_close = float(candles[i-1]['c'])
-            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
-            tr_list.append(tr)
-
-        atr = np.mean(tr_list[:period])
-        for tr in tr_list[period:]:
-            atr = (tr / period) + (atr * (1 - 1/period))
-        return atr
-
-    def get_volatility_multiplier(self, mid_price):
-        candles = self.get_candles(ATR_INTERVAL, ATR_PERIOD + 5)
-        if not candles:
+        return float(wilder_atr(candles[:, 1], candles[:, 2], candles[:, 3], period))
+
+    def get_volatility_multiplier(self, mid_price, candles):
+        if len(candles) == 0:
             return 1.0
         atr = self.calculate_atr(candles, ATR_PERIOD)
         if atr is None or mid_price <= 0:
@@ -97,32 +110,31 @@ class HyperliquidFuturesMM:
         return max(VOL_MULTIPLIER_MIN, min(VOL_MULTIPLIER_MAX, vol_mult))
 
     def calculate_inventory_adjusted_spreads(self, pos_ratio, vol_mult=1.0):
-        adj = pos_ratio * INVENTORY_SKEW_MULTIPLIER
-        long_spreads = [max(0.0001, s * (1 + adj) * vol_mult) for s in LONG_SPREADS]
-        short_spreads = [max(0.0001, s * (1 - adj) * vol_mult) for s in SHORT_SPREADS]
-        return long_spreads, short_spreads
-
-    async def _place_orders_sequential(self, order_method, orders, delay=0.2):
-        results = []
-        for i, (qty, price) in enumerate(orders, 1):
-            result = await asyncio.to_thread(order_method, qty, price)
-            results.append(result)
-            if i < len(orders):
-                await asyncio.sleep(delay)
-        return results
+        return inventory_adjusted_spreads(pos_ratio, vol_mult, LONG_SPREADS_ARR, SHORT_SPREADS_ARR, INVENTORY_SKEW_MULTIPLIER)
+
+    async def _trader_concurrent(self, calls):
+        async def run_one(call):
+            async with self._order_limiter:
+                # Nonce spacing happens on the worker right before the SDK call
+                return await asyncio.to_thread(self.trader.run_action, call)
+
+        return await asyncio.gather(*(run_one(call) for call in calls), return_exceptions=True)
+
+    async def _place_orders_concurrent(self, order_method, orders):
+        return await self._trader_concurrent([partial(order_method, qty, price) for qty, price in orders])
 
     async def get_mid_price(self):
         try:
             return await asyncio.to_thread(self.trader.get_mid_price)
         except Exception as e:
-            print(f"[ERROR] get_mid_price: {e}")
+            log.error(f"[ERROR] get_mid_price: {e}")
             return None
 
     async def get_position(self):
         try:
             return await asyncio.to_thread(self.trader.get_perp_position)
         except Exception as e:
-            print(f"[ERROR] get_position: {e}")
+            log.error(f"[ERROR] get_position: {e}")
             return {'size': 0, 'entry_price': 0, 'unrealized_pnl': 0, 'margin_used': 0}
 
     async def place_orders(self, side, mid, pos_val, pos_ratio, vol_mult, open_cnt):
@@ -135,15 +147,15 @@ class HyperliquidFuturesMM:
 
         # Check slots
         if open_cnt + num_tiers > MAX_OPEN_ORDERS:
-            print(f"[ORDER] Skip {side_name} (need {num_tiers} slots, only {MAX_OPEN_ORDERS - open_cnt} available)")
+            log.info(f"[ORDER] Skip {side_name} (need {num_tiers} slots, only {MAX_OPEN_ORDERS - open_cnt} available)")
             return False
 
         # Check position limits
         if is_long and pos_val >= MAX_POSITION_USD:
-            print(f"[ORDER] Skip {side_name} (pos_ratio {pos_ratio:.1%} >= 100%)")
+            log.info(f"[ORDER] Skip {side_name} (pos_ratio {pos_ratio:.1%} >= 100%)")
             return False
         if not is_long and pos_val <= -MAX_POSITION_USD:
-            print(f"[ORDER] Skip {side_name} (pos_ratio {pos_ratio:.1%} <= -100%)")
+            log.info(f"[ORDER] Skip {side_name} (pos_ratio {pos_ratio:.1%} <= -100%)")
             return False
 
         # Calculate spreads
@@ -151,56 +163,53 @@ class HyperliquidFuturesMM:
         spreads = long_sp if is_long else short_sp
 
         # Build orders
-        orders = []
-        for ratio, spread in zip(ORDER_RATIOS, spreads):
-            price = self.format_price(mid * (1 - spread if is_long else 1 + spread))
-            qty = self.format_quantity((ORDER_SIZE_USD * ratio) / price)
-            orders.append((qty, price))
+        prices = self.format_price(mid * (1 - spreads if is_long else 1 + spreads))
+        qtys = self.format_quantity(ORDER_USD_ARR / prices)
+        orders = list(zip(qtys.tolist(), prices.tolist()))
 
         # Execute
         try:
             order_method = self.trader.perp_long if is_long else self.trader.perp_short
-            results = await self._place_orders_sequential(order_method, orders)
+            results = await self._place_orders_concurrent(order_method, orders)
             success_cnt = sum(1 for r in results if not isinstance(r, Exception) and r.get('success'))
 
             sign = '-' if is_long else '+'
-            order_str = "  ".join([f"{sign}{s*100:.2f}% @{int(p):,}" for (q, p), s in zip(orders, spreads)])
-            print(f"[ORDER] {side_name}({success_cnt}/{num_tiers}): {order_str}")
+            order_str = "  ".join(f"{sign}{s*100:.2f}% @{int(p):,}" for (q, p), s in zip(orders, spreads))
+            log.info(f"[ORDER] {side_name}({success_cnt}/{num_tiers}): {order_str}")
             return success_cnt > 0
         except Exception as e:
-            print(f"[ERROR] {side_name} orders: {e}")
+            log.error(f"[ERROR] {side_name} orders: {e}")
             return False
 
-    async def cancel_old_orders(self):
+    async def cancel_old_orders(self, open_orders):
         try:
-            open_orders = await asyncio.to_thread(self.trader.get_open_orders)
-            now = time.time()
-            cancelled_long = cancelled_short = 0
-
-            for order in open_orders:
-                age_min = (now * 1000 - order['timestamp']) / 1000 / 60
-                if age_min > ORDER_EXPIRY_MINUTES:
-                    result = await asyncio.to_thread(self.trader.cancel_order, order['oid'])
-                    if result.get('success'):
-                        if order['side'] == 'buy':
-                            cancelled_long += 1
-                        else:
-                            cancelled_short += 1
+            expired = (time.time() * 1000 - open_orders.timestamps) > ORDER_EXPIRY_MINUTES * 60_000
+            if not expired.any():
+                return
+
+            # One signed cancel action for every stale order
+            (results,) = await self._trader_concurrent([partial(self.trader.bulk_cancel, open_orders.oids[expired].tolist())])
+            if isinstance(results, Exception):
+                raise results
+            cancelled_long, cancelled_short = hyperliquid_trade.tally_cancels(open_orders.is_buy[expired], results)
 
             if cancelled_long > 0 or cancelled_short > 0:
-                print(f"[CANCEL] {cancelled_long} long, {cancelled_short} short (>{ORDER_EXPIRY_MINUTES}min)")
+                log.info(f"[CANCEL] {cancelled_long} long, {cancelled_short} short (>{ORDER_EXPIRY_MINUTES}min)")
         except Exception as e:
-            print(f"[ERROR] cancel_old: {e}")
+            log.error(f"[ERROR] cancel_old: {e}")
 
     async def run_single_iteration(self):
         try:
-            mid = await self.get_mid_price()
+            mid, candles, position, open_orders = await asyncio.gather(
+                self.get_mid_price(),
+                self.get_candles(ATR_INTERVAL, ATR_PERIOD + 5),
+                self.get_position(),
+                asyncio.to_thread(self.trader.get_open_order_arrays),
+            )
             if not mid:
                 return
 
-            vol_mult = self.get_volatility_multiplier(mid)
-            position = await self.get_position()
-            open_orders = await asyncio.to_thread(self.trader.get_open_orders)
+            vol_mult = self.get_volatility_multiplier(mid, candles)
 
             pos_val = position['size'] * mid
             pos_ratio = pos_val / MAX_POSITION_USD if MAX_POSITION_USD > 0 else 0
@@ -208,39 +217,41 @@ class HyperliquidFuturesMM:
 
             pos_status = "Neutral" if abs(position['size']) < 0.001 else ("Long" if position['size'] > 0 else "Short")
 
-            # HIP-style log
-            print(f"\n{'='*50}")
-            print(f"[{datetime.now().strftime('%H:%M:%S')}]")
-            print(f"{COIN} | Mid: {mid:,.0f} | Vol: {vol_mult:.2f}x | Inv: {inv_adj:+.2f} ({pos_ratio:+.1%})")
-            print(f"Pos: {position['size']:.3f} {COIN} (${abs(pos_val):,.0f}) {pos_status} | Entry: {position['entry_price']:,.0f} | PnL: {position['unrealized_pnl']:+.2f}")
+            # HIP-style log, written as one block
+            log.info("\n".join((
+                f"\n{'='*50}",
+                f"[{time.strftime('%H:%M:%S')}]",
+                f"{COIN} | Mid: {mid:,.0f} | Vol: {vol_mult:.2f}x | Inv: {inv_adj:+.2f} ({pos_ratio:+.1%})",
+                f"Pos: {position['size']:.3f} {COIN} (${abs(pos_val):,.0f}) {pos_status} | Entry: {position['entry_price']:,.0f} | PnL: {position['unrealized_pnl']:+.2f}",
+            )))
 
-            long_cnt = len([o for o in open_orders if o['side'] == 'buy'])
-            short_cnt = len([o for o in open_orders if o['side'] == 'sell'])
+            long_cnt = int(open_orders.is_buy.sum())
+            short_cnt = len(open_orders) - long_cnt
 
             await self.place_orders('long', mid, pos_val, pos_ratio, vol_mult, long_cnt)
             await self.place_orders('short', mid, pos_val, pos_ratio, vol_mult, short_cnt)
 
-            print(f"[ORDERS] {long_cnt} buys, {short_cnt} sells")
-            await self.cancel_old_orders()
+            log.info(f"[ORDERS] {long_cnt} buys, {short_cnt} sells")
+            await self.cancel_old_orders(open_orders)
 
         except Exception as e:
-            print(f"[ERROR] iteration: {e}")
+            log.error(f"[ERROR] iteration: {e}")
 
     async def run(self):
-        print(f"[START] {COIN} | Size: {ORDER_SIZE_USD:,} | Max: {MAX_POSITION_USD:,}")
-        print(f"[CONFIG] Spreads: {LONG_SPREADS} | Ratios: {ORDER_RATIOS}")
-        print(f"[CONFIG] Skew: {INVENTORY_SKEW_MULTIPLIER}x | ATR: {ATR_INTERVAL}/{ATR_PERIOD}")
-        print("=" * 50)
+        log.info(f"[START] {COIN} | Size: {ORDER_SIZE_USD:,} | Max: {MAX_POSITION_USD:,}")
+        log.info(f"[CONFIG] Spreads: {LONG_SPREADS} | Ratios: {ORDER_RATIOS}")
+        log.info(f"[CONFIG] Skew: {INVENTORY_SKEW_MULTIPLIER}x | ATR: {ATR_INTERVAL}/{ATR_PERIOD}")
+        log.info("=" * 50)
 
         while True:
             try:
                 await self.run_single_iteration()
                 await asyncio.sleep(CHECK_INTERVAL)
             except KeyboardInterrupt:
-                print("\n[STOP] Shutting down...")
+                log.info("\n[STOP] Shutting down...")
                 break
             except Exception as e:
-                print(f"[ERROR] main: {e}")
+                log.error(f"[ERROR] main: {e}")
                 await asyncio.sleep(5)
 
 
@@ -250,4 +261,7 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -0,0 +1,35 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """No-op fallback so indicators still run as plain Python without numba"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# Explicit signature compiles at import instead of stalling the first iteration; f8[:] accepts strided column views
+@njit('f8(f8[:], f8[:], f8[:], i8)', cache=True, fastmath=True)
+def wilder_atr(high, low, close, period):
+    """ATR with Wilder's smoothing, computed in one pass over high/low/close"""
+    tr_sum = 0.0
+    for i in range(1, period + 1):
+        tr_sum += max(high[i] - low[i], abs(high[i] - close[i-1]), abs(low[i] - close[i-1]))
+
+    atr = tr_sum / period
+    multiplier = 1.0 / period
+    for i in range(period + 1, high.shape[0]):
+        tr = max(high[i] - low[i], abs(high[i] - close[i-1]), abs(low[i] - close[i-1]))
+        atr = tr * multiplier + atr * (1.0 - multiplier)
+    return atr
+
+
+@njit('Tuple((f8[:], f8[:]))(f8, f8, f8[:], f8[:], f8)', cache=True)
+def inventory_adjusted_spreads(inventory_ratio, vol_multiplier, long_spreads, short_spreads, skew):
+    """Skew long/short tier spreads by inventory and scale by volatility, floored at 0.01%"""
+    adj = inventory_ratio * skew
+    long_adjusted = np.maximum(0.0001, long_spreads * ((1.0 + adj) * vol_multiplier))
+    short_adjusted = np.maximum(0.0001, short_spreads * ((1.0 - adj) * vol_multiplier))
+    return long_adjusted, short_adjusted
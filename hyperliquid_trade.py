@@ -1,9 +1,110 @@
+import atexit
+from dataclasses import dataclass
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from hyperliquid.utils import constants
+from hyperliquid.websocket_manager import WebsocketManager
 import hyperliquid_utils
 
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from json import dumps as _json_dumps, loads as json_loads
+
+    def json_dumps(obj):
+        return _json_dumps(obj).encode()
+
+# Bot and trader log lines, from the event loop and worker threads alike, are queued and
+# written to stdout in order by one listener thread
+log = logging.getLogger('hl_mm')
+log.setLevel(logging.INFO)
+log.propagate = False
+_LOG_QUEUE = queue.SimpleQueue()
+log.addHandler(QueueHandler(_LOG_QUEUE))
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter('%(message)s'))
+_LOG_LISTENER = QueueListener(_LOG_QUEUE, _stdout_handler)
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
+
 API_URL = 'https://api.hyperliquid.xyz/info'
 
+# One keep-alive session for every info request instead of a new TCP/TLS connection per call.
+# Info requests are read-only, so retrying POST on connection/read errors is safe.
+SESSION = requests.Session()
+SESSION.headers.update({'Content-Type': 'application/json'})
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16, pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.1, allowed_methods=frozenset({'POST'}))
+))
+
+# Streamed mids older than this are ignored and get_mid_price falls back to REST
+MID_STREAM_MAX_AGE = 10
+
+# Exchange nonces are ms timestamps, so signed actions are started at least this many seconds apart
+ACTION_SPACING = 0.01
+
+
+def parse_response(response):
+    """Decode a 200 response body straight from bytes, or None for any other status"""
+    return json_loads(response.content) if response.status_code == 200 else None
+
+
+def quantity_formatter(size_decimals):
+    """Array order-size rounding for a market's size decimals, picked once instead of branching per call"""
+    if size_decimals == 0:
+        def format_quantity(quantity):
+            return np.rint(quantity).astype(np.int64)
+    else:
+        def format_quantity(quantity):
+            # Python's round is exact at decimal ties, where np.round's scale-and-rint can round the other way
+            return np.array([round(q, size_decimals) for q in quantity.tolist()])
+    return format_quantity
+
+
+def price_formatter(tick_size):
+    """Array order-price rounding to a market's tick size, picked once instead of branching per call"""
+    if tick_size == 1:
+        return np.rint
+
+    def format_price(price):
+        return np.round(price / tick_size) * tick_size
+    return format_price
+
+
+def tally_cancels(is_buy, results):
+    """Count successful per-order cancel results as (buys, sells), given the cancelled orders' is_buy flags"""
+    cancelled_buy = cancelled_sell = 0
+    for buy, result in zip(is_buy.tolist(), results):
+        if isinstance(result, dict) and result.get('success'):
+            if buy:
+                cancelled_buy += 1
+            else:
+                cancelled_sell += 1
+    return cancelled_buy, cancelled_sell
+
+
+@dataclass
+class OpenOrders:
+    """Open orders for one market as parallel arrays"""
+    oids: np.ndarray
+    is_buy: np.ndarray
+    prices: np.ndarray
+    sizes: np.ndarray
+    timestamps: np.ndarray
+
+    def __len__(self):
+        return len(self.oids)
+
 
 class HyperliquidTrader:
     def __init__(self, coin: str, symbol: str, tick_size: float = 1, size_decimals: int = 5, dex: str = None):
@@ -12,9 +113,16 @@ class HyperliquidTrader:
         self.tick_size = tick_size
         self.size_decimals = size_decimals
         self.dex = dex
-        api_url = constants.MAINNET_API_URL
+        self.api_url = constants.MAINNET_API_URL
         perp_dexs = [dex] if dex else None
-        self.address, self.info, self.exchange = hyperliquid_utils.setup(api_url, skip_ws=True, perp_dexs=perp_dexs)
+        self.address, self.info, self.exchange = hyperliquid_utils.setup(self.api_url, skip_ws=True, perp_dexs=perp_dexs)
+        self._ws = None
+        self._streamed_mid = None
+        self._action_lock = threading.Lock()
+        self._last_action_at = 0.0
+        # Info payloads only depend on the account and dex, so each is encoded once and reused
+        self._payloads = {}
+        self._all_mids_payload = json_dumps({'type': 'allMids', 'dex': dex} if dex else {'type': 'allMids'})
 
     @staticmethod
     def _execute_order(method, *args, **kwargs):
@@ -28,7 +136,7 @@ class HyperliquidTrader:
             for status in result["response"]["data"]["statuses"]:
                 if "filled" in status:
                     filled = status["filled"]
-                    print(f"Filled: {filled['totalSz']} @ ${filled['avgPx']}")
+                    log.info(f"Filled: {filled['totalSz']} @ ${filled['avgPx']}")
 
             return {"success": True, "data": result}
 
@@ -38,27 +146,38 @@ class HyperliquidTrader:
     def _api_request(self, request_type, exclude_dex=False, **extra_params):
         """Common method for API POST requests"""
         try:
-            payload = {'type': request_type, 'user': self.address}
-            if self.dex and not exclude_dex:
-                payload['dex'] = self.dex
-            payload.update(extra_params)
-
-            response = requests.post(
-                API_URL,
-                headers={'Content-Type': 'application/json'},
-                json=payload
-            )
+            key = (request_type, exclude_dex)
+            body = None if extra_params else self._payloads.get(key)
+            if body is None:
+                payload = {'type': request_type, 'user': self.address}
+                if self.dex and not exclude_dex:
+                    payload['dex'] = self.dex
+                payload.update(extra_params)
+                body = json_dumps(payload)
+                if not extra_params:
+                    self._payloads[key] = body
+
+            response = SESSION.post(API_URL, data=body)
 
             if response.status_code != 200:
-                print(f"API error ({request_type}): {response.status_code}")
+                log.error(f"API error ({request_type}): {response.status_code}")
                 return None
 
-            return response.json()
+            return json_loads(response.content)
 
         except Exception as e:
-            print(f"API request error ({request_type}): {e}")
+            log.error(f"API request error ({request_type}): {e}")
             return None
 
+    def run_action(self, call):
+        """Run a signed exchange action on the calling thread, at least ACTION_SPACING after the previous one started"""
+        with self._action_lock:
+            wait = self._last_action_at + ACTION_SPACING - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_action_at = time.monotonic()
+        return call()
+
     def spot_buy(self, quantity, price, order_type="Gtc"):
         """Place spot buy order"""
         return self._execute_order(
@@ -84,66 +203,116 @@ class HyperliquidTrader:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def get_spot_balance(self):
-        """Get spot balances via spotClearinghouseState API"""
+    def bulk_cancel(self, oids):
+        """Cancel several orders in one signed action, returning a result per oid"""
+        try:
+            result = self.exchange.bulk_cancel([{"coin": self.symbol, "oid": oid} for oid in oids])
+            if result["status"] != "ok":
+                return [{"success": False, "error": result} for _ in oids]
+
+            return [
+                {"success": True} if status == "success" else {"success": False, "error": status}
+                for status in result["response"]["data"]["statuses"]
+            ]
+        except Exception as e:
+            return [{"success": False, "error": str(e)} for _ in oids]
+
+    def get_spot_balance(self, coins=None):
+        """Get spot balances via spotClearinghouseState API, optionally only for the given coins"""
         data = self._api_request('spotClearinghouseState')
 
         if not data:
             return {}
 
         balances = {}
-        for balance in data.get('balances', []):
+        for balance in data.get('balances', ()):
             coin = balance['coin']
-            total = float(balance['total'])
-            balances[coin] = total
+            if coins is None or coin in coins:
+                balances[coin] = float(balance['total'])
+                # Stop scanning once every requested coin is found
+                if coins is not None and len(balances) == len(coins):
+                    break
 
         return balances
 
-    def get_mid_price(self):
-        """Get mid price from allMids API"""
+    @property
+    def _mid_key(self):
+        return self.symbol if self.symbol.startswith('@') else self.coin
+
+    def start_mid_stream(self):
+        """Subscribe to allMids over websocket so mid prices arrive without polling"""
+        if self._ws is not None:
+            return
+        subscription = {'type': 'allMids'}
+        if self.dex:
+            subscription['dex'] = self.dex
+
         try:
-            payload = {'type': 'allMids'}
-            if self.dex:
-                payload['dex'] = self.dex
+            self._ws = WebsocketManager(self.api_url)
+            self._ws.daemon = True
+            self._ws.start()
+            self._ws.subscribe(subscription, self._on_all_mids)
+        except Exception as e:
+            log.error(f"Mid stream error: {e}")
+            self._ws = None
 
-            response = requests.post(
-                API_URL,
-                headers={'Content-Type': 'application/json'},
-                json=payload
-            )
+    def stop_mid_stream(self):
+        """Stop the allMids websocket and its ping thread so the process can exit"""
+        if self._ws is None:
+            return
+        try:
+            self._ws.stop()
+        except Exception as e:
+            log.error(f"Mid stream stop error: {e}")
+        self._ws = None
+        self._streamed_mid = None
+
+    def _on_all_mids(self, msg):
+        mid = msg.get('data', {}).get('mids', {}).get(self._mid_key)
+        if mid is not None:
+            self._streamed_mid = (float(mid), time.time())
+
+    def get_streamed_mid(self):
+        """Latest websocket mid price, or None if the stream is not running or has gone stale"""
+        streamed = self._streamed_mid
+        if streamed is None or time.time() - streamed[1] > MID_STREAM_MAX_AGE:
+            return None
+        return streamed[0] if streamed[0] > 0 else None
 
-            if response.status_code != 200:
+    def get_mid_price(self):
+        """Get mid price from allMids API"""
+        try:
+            data = parse_response(SESSION.post(API_URL, data=self._all_mids_payload))
+            if data is None:
                 return None
 
-            data = response.json()
-
-            key = self.symbol if self.symbol.startswith('@') else self.coin
-            mid_price = float(data.get(key, 0))
+            mid_price = float(data.get(self._mid_key, 0))
             return mid_price if mid_price > 0 else None
         except Exception as e:
-            print(f"Mid price error: {e}")
+            log.error(f"Mid price error: {e}")
             return None
 
-    def get_open_orders(self):
-        """Get open orders from exchange"""
-        data = self._api_request('openOrders')
-
-        if not data:
-            return []
-
-        # Filter for spot orders
-        spot_orders = []
-        for order in data:
-            if order.get('coin') == self.symbol:
-                spot_orders.append({
-                    'oid': order['oid'],
-                    'side': 'buy' if order['side'] == 'B' else 'sell',
-                    'price': float(order['limitPx']),
-                    'size': float(order['sz']),
-                    'timestamp': order['timestamp']
-                })
-
-        return spot_orders
+    def get_open_order_arrays(self):
+        """Get open orders for this market as an OpenOrders record of parallel arrays"""
+        data = self._api_request('openOrders') or []
+        orders = [order for order in data if order.get('coin') == self.symbol]
+
+        n = len(orders)
+        open_orders = OpenOrders(
+            oids=np.empty(n, dtype=np.int64),
+            is_buy=np.empty(n, dtype=np.bool_),
+            prices=np.empty(n, dtype=np.float64),
+            sizes=np.empty(n, dtype=np.float64),
+            timestamps=np.empty(n, dtype=np.int64)
+        )
+        for i, order in enumerate(orders):
+            open_orders.oids[i] = order['oid']
+            open_orders.is_buy[i] = order['side'] == 'B'
+            open_orders.prices[i] = float(order['limitPx'])
+            open_orders.sizes[i] = float(order['sz'])
+            open_orders.timestamps[i] = order['timestamp']
+
+        return open_orders
 
     # ===== Perp Methods =====
 